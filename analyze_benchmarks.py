@@ -6,37 +6,178 @@ This script analyzes benchmark results from the RISC Zero auction benchmarks
 and generates visualizations and statistical reports.
 
 Usage:
-    python3 analyze_benchmarks.py [results_dir]
+    python3 analyze_benchmarks.py [results_dir] [--raster]
 
     results_dir: Path to benchmark results directory (default: benchmark_results/latest)
+    --raster:    Save plots as PNG instead of SVG (resolution set by BENCH_PLOT_DPI, default 150)
 """
 
+import argparse
 import json
 import sys
 import os
-from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import csv
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    print("Error: numpy is required for benchmark analysis")
+    print("       Install with: pip install numpy")
+    sys.exit(1)
+
+# Prefer orjson for decoding result files; the stdlib parser accepts bytes too
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Record count from which compute_metrics uses the numba-compiled kernel (if numba
+# is installed); below it, importing numba costs more than the NumPy expressions
+_NUMBA_MIN_RECORDS = 100_000
+
+# Sort key for benchmark records
+_pc = itemgetter('participant_count')
+
+# Column layout of the structured array built from the benchmark records
+BENCHMARK_DTYPE = [
+    ('n', 'i8'),      # participant_count
+    ('uc', 'i8'),     # user_cycles
+    ('tc', 'i8'),     # total_cycles
+    ('tms', 'i8'),    # total_time_ms
+    ('seg', 'i4'),    # session_segments
+    ('pms', 'i8'),    # proving_time_ms
+    ('rcpt', 'i8'),   # receipt_size_bytes
+    ('jnl', 'i8'),    # journal_size_bytes
+    ('ts', object),   # timestamp
+]
+
+def _read_json(path: str) -> Any:
+    """Read and parse a single JSON file."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+@functools.lru_cache(maxsize=8)
+def _load_summary(summary_file: str, mtime_ns: int) -> Tuple[Dict[str, Any], ...]:
+    """Parse the combined summary file; mtime_ns only keys the cache."""
+    return tuple(sorted(_read_json(summary_file), key=_pc))
+
+@functools.lru_cache(maxsize=8)
+def _load_run_files(run_files: Tuple[Tuple[str, int], ...]) -> Tuple[Dict[str, Any], ...]:
+    """Parse individual run files given as (path, mtime_ns) pairs; the mtimes only key the cache."""
+    # Reads are IO-bound, so overlap them across threads
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_read_json, (json_file for json_file, _ in run_files)))
+
+    return tuple(sorted(results, key=_pc))
 
 def load_benchmark_data(results_dir: str) -> List[Dict[str, Any]]:
-    """Load all benchmark JSON files from the results directory."""
-    summary_file = Path(results_dir) / "benchmark_summary.json"
+    """Load all benchmark JSON files from the results directory, sorted by participant count.
 
-    if summary_file.exists():
-        with open(summary_file, 'r') as f:
-            return json.load(f)
+    Parsed results are cached per file and modification time, so repeated calls
+    only re-read the directory when its benchmark files have changed. Each call
+    returns fresh copies of the records, so editing them leaves the cache intact.
+    """
+    summary_file = os.path.join(results_dir, "benchmark_summary.json")
 
-    # Fallback: load individual files
-    results = []
-    for json_file in sorted(Path(results_dir).glob("benchmark_N*.json")):
-        with open(json_file, 'r') as f:
-            results.append(json.load(f))
-
-    return results
+    # A single stat both checks for the summary and provides its cache key
+    try:
+        summary_mtime_ns = os.stat(summary_file).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    else:
+        return [dict(d) for d in _load_summary(summary_file, summary_mtime_ns)]
 
-def print_statistics(data: List[Dict[str, Any]]):
+    # Fallback: load individual files
+    try:
+        with os.scandir(results_dir) as it:
+            run_files = tuple(sorted(
+                (entry.path, entry.stat().st_mtime_ns) for entry in it
+                if entry.is_file() and entry.name.startswith("benchmark_N") and entry.name.endswith(".json")
+            ))
+    except NotADirectoryError:
+        return []
+
+    return [dict(d) for d in _load_run_files(run_files)]
+
+def to_array(data: List[Dict[str, Any]]) -> np.ndarray:
+    """Convert benchmark records into a NumPy structured array, preserving their order."""
+    return np.array([
+        (d['participant_count'], d['user_cycles'], d['total_cycles'], d['total_time_ms'],
+         d['session_segments'], d['proving_time_ms'], d['receipt_size_bytes'],
+         d['journal_size_bytes'], d['timestamp'])
+        for d in data
+    ], dtype=BENCHMARK_DTYPE)
+
+def _metrics(n, uc, tc, tms):
+    """Per-run overhead %, user/total cycles per participant and ms per participant.
+
+    The four metrics are returned as the rows of a single (4, N) array.
+    """
+    out = np.empty((4, n.size))
+    out[0] = np.where(uc > 0, (tc - uc) / uc * 100.0, 0.0)
+    out[1] = uc / n
+    out[2] = tc / n
+    out[3] = tms / n
+    return out
+
+@functools.lru_cache(maxsize=None)
+def _jitted_metrics():
+    """Return _metrics compiled with numba, or None when numba is not installed."""
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.njit(cache=True)(_metrics)
+
+def compute_metrics(arr: np.ndarray):
+    """Compute the derived per-run metrics (see _metrics) for a structured array.
+
+    Large inputs use the numba-compiled kernel when numba is available.
+    """
+    kernel = _metrics
+    if arr.size >= _NUMBA_MIN_RECORDS:
+        kernel = _jitted_metrics() or _metrics
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return kernel(arr['n'].astype(np.float64), arr['uc'].astype(np.float64),
+                      arr['tc'].astype(np.float64), arr['tms'].astype(np.float64))
+
+def fit_exponent(n: np.ndarray, log_n: np.ndarray, y: np.ndarray) -> Optional[Tuple[float, float]]:
+    """Fit y ~ c * n^k in log-log space, returning the exponent k and the fit's R².
+
+    Only runs where both n and y are positive are used; log_n is log(n) precomputed
+    for those runs so it can be shared between the fits of several metrics. Returns
+    None when fewer than two distinct participant counts remain.
+    """
+    mask = (n > 0) & (y > 0)
+    if np.unique(n[mask]).size < 2:
+        return None
+
+    log_n = log_n[mask]
+    log_y = np.log(y[mask])
+    slope, intercept = np.polyfit(log_n, log_y, 1)
+    residuals = log_y - (slope * log_n + intercept)
+    ss_res = np.sum(residuals ** 2)
+    ss_tot = np.sum((log_y - log_y.mean()) ** 2)
+    r_squared = 1 - ss_res / ss_tot if ss_tot > 0 else 1.0
+    return slope, r_squared
+
+def format_complexity(fit: Optional[Tuple[float, float]]) -> str:
+    """Format a fit_exponent result as O(n^k) with its R², or n/a if there was no fit."""
+    if fit is None:
+        return "n/a"
+    exponent, r_squared = fit
+    return f"O(n^{exponent:.2f})  (R² = {r_squared:.3f})"
+
+def print_statistics(arr: np.ndarray, metrics: np.ndarray):
     """Print statistical summary of benchmark results."""
-    if not data:
+    if arr.size == 0:
         print("No data to analyze")
         return
 
@@ -45,8 +186,8 @@ def print_statistics(data: List[Dict[str, Any]]):
     print("="*80 + "\n")
 
     # Overall statistics
-    print(f"Total benchmark runs: {len(data)}")
-    print(f"Participant range: {min(d['participant_count'] for d in data)} to {max(d['participant_count'] for d in data)}")
+    print(f"Total benchmark runs: {arr.size}")
+    print(f"Participant range: {arr['n'][0]} to {arr['n'][-1]}")
     print()
 
     # Detailed table
@@ -55,17 +196,14 @@ def print_statistics(data: List[Dict[str, Any]]):
     print(f"{'N':>4} | {'User Cycles':>12} | {'Total Cycles':>13} | {'Segments':>8} | {'Proving (ms)':>12} | {'Total (ms)':>10} | {'Receipt (KB)':>12} | {'Journal (KB)':>12}")
     print("-" * 135)
 
-    for item in sorted(data, key=lambda x: x['participant_count']):
-        n = item['participant_count']
-        user_cycles = item['user_cycles']
-        total_cycles = item['total_cycles']
-        segments = item['session_segments']
-        proving_ms = item['proving_time_ms']
-        total_ms = item['total_time_ms']
-        receipt_kb = item['receipt_size_bytes'] / 1024
-        journal_kb = item['journal_size_bytes'] / 1024
-
-        print(f"{n:>4} | {user_cycles:>12,} | {total_cycles:>13,} | {segments:>8} | {proving_ms:>12,} | {total_ms:>10,} | {receipt_kb:>12.2f} | {journal_kb:>12.2f}")
+    # Format every row first and write the table in one call
+    lines = []
+    rows = zip(arr['n'].tolist(), arr['uc'].tolist(), arr['tc'].tolist(), arr['seg'].tolist(),
+               arr['pms'].tolist(), arr['tms'].tolist(), (arr['rcpt'] / 1024).tolist(),
+               (arr['jnl'] / 1024).tolist())
+    for n, user_cycles, total_cycles, segments, proving_ms, total_ms, receipt_kb, journal_kb in rows:
+        lines.append(f"{n:>4} | {user_cycles:>12,} | {total_cycles:>13,} | {segments:>8} | {proving_ms:>12,} | {total_ms:>10,} | {receipt_kb:>12.2f} | {journal_kb:>12.2f}")
+    sys.stdout.write('\n'.join(lines) + '\n')
 
     print("-" * 135)
     print()
@@ -75,44 +213,39 @@ def print_statistics(data: List[Dict[str, Any]]):
     print("-" * 80)
 
     # Compare first and last
-    first = min(data, key=lambda x: x['participant_count'])
-    last = max(data, key=lambda x: x['participant_count'])
-
-    n_ratio = last['participant_count'] / first['participant_count']
-    user_cycle_ratio = last['user_cycles'] / first['user_cycles']
-    total_cycle_ratio = last['total_cycles'] / first['total_cycles']
-    segment_ratio = last['session_segments'] / first['session_segments']
-    time_ratio = last['total_time_ms'] / first['total_time_ms']
-
-    print(f"Participants increased by: {n_ratio:.1f}x ({first['participant_count']} → {last['participant_count']})")
-    print(f"User cycles increased by:  {user_cycle_ratio:.2f}x ({first['user_cycles']:,} → {last['user_cycles']:,})")
-    print(f"Total cycles increased by: {total_cycle_ratio:.2f}x ({first['total_cycles']:,} → {last['total_cycles']:,})")
-    print(f"Segments increased by:     {segment_ratio:.2f}x ({first['session_segments']} → {last['session_segments']})")
-    print(f"Time increased by:         {time_ratio:.2f}x ({first['total_time_ms']:,}ms → {last['total_time_ms']:,}ms)")
+    first = arr[0]
+    last = arr[-1]
+
+    n_ratio = last['n'] / first['n']
+    user_cycle_ratio = last['uc'] / first['uc']
+    total_cycle_ratio = last['tc'] / first['tc']
+    segment_ratio = last['seg'] / first['seg']
+    time_ratio = last['tms'] / first['tms']
+
+    print(f"Participants increased by: {n_ratio:.1f}x ({first['n']} → {last['n']})")
+    print(f"User cycles increased by:  {user_cycle_ratio:.2f}x ({first['uc']:,} → {last['uc']:,})")
+    print(f"Total cycles increased by: {total_cycle_ratio:.2f}x ({first['tc']:,} → {last['tc']:,})")
+    print(f"Segments increased by:     {segment_ratio:.2f}x ({first['seg']} → {last['seg']})")
+    print(f"Time increased by:         {time_ratio:.2f}x ({first['tms']:,}ms → {last['tms']:,}ms)")
     print()
 
-    # Estimate complexity
-    import math
+    # Estimate complexity from a log-log fit over all runs
     if n_ratio > 1:
-        complexity_user_cycles = math.log(user_cycle_ratio) / math.log(n_ratio)
-        complexity_total_cycles = math.log(total_cycle_ratio) / math.log(n_ratio)
-        complexity_time = math.log(time_ratio) / math.log(n_ratio)
+        n = arr['n']
+        log_n = np.log(n, out=np.zeros(n.shape), where=n > 0)
 
         print("Estimated Computational Complexity:")
-        print(f"  User Cycles:  O(n^{complexity_user_cycles:.2f})")
-        print(f"  Total Cycles: O(n^{complexity_total_cycles:.2f})")
-        print(f"  Time:         O(n^{complexity_time:.2f})")
+        print(f"  User Cycles:  {format_complexity(fit_exponent(n, log_n, arr['uc']))}")
+        print(f"  Total Cycles: {format_complexity(fit_exponent(n, log_n, arr['tc']))}")
+        print(f"  Time:         {format_complexity(fit_exponent(n, log_n, arr['tms']))}")
         print()
 
     # Efficiency metrics
     print("Efficiency Metrics:")
     print("-" * 80)
-    avg_user_cycles_per_participant = sum(d['user_cycles'] / d['participant_count'] for d in data) / len(data)
-    avg_total_cycles_per_participant = sum(d['total_cycles'] / d['participant_count'] for d in data) / len(data)
-    avg_time_per_participant = sum(d['total_time_ms'] / d['participant_count'] for d in data) / len(data)
-
-    # Calculate overhead
-    avg_overhead = sum((d['total_cycles'] - d['user_cycles']) / d['user_cycles'] * 100 for d in data) / len(data)
+    # One reduction over the metric rows instead of a pass per average
+    (avg_overhead, avg_user_cycles_per_participant,
+     avg_total_cycles_per_participant, avg_time_per_participant) = metrics.mean(axis=1)
 
     print(f"Average user cycles per participant:    {avg_user_cycles_per_participant:,.0f}")
     print(f"Average total cycles per participant:   {avg_total_cycles_per_participant:,.0f}")
@@ -120,7 +253,7 @@ def print_statistics(data: List[Dict[str, Any]]):
     print(f"Average time per participant:           {avg_time_per_participant:,.0f} ms")
     print()
 
-def generate_csv_report(data: List[Dict[str, Any]], output_file: str):
+def generate_csv_report(arr: np.ndarray, metrics: np.ndarray, output_file: str):
     """Generate a detailed CSV report."""
     with open(output_file, 'w', newline='') as f:
         writer = csv.writer(f)
@@ -130,28 +263,28 @@ def generate_csv_report(data: List[Dict[str, Any]], output_file: str):
             'Total Cycles/Participant', 'Overhead %', 'Time/Participant (ms)', 'Timestamp'
         ])
 
-        for item in sorted(data, key=lambda x: x['participant_count']):
-            overhead = (item['total_cycles'] - item['user_cycles']) / item['user_cycles'] * 100 if item['user_cycles'] > 0 else 0
-            writer.writerow([
-                item['participant_count'],
-                item['user_cycles'],
-                item['total_cycles'],
-                item['session_segments'],
-                item['proving_time_ms'],
-                item['total_time_ms'],
-                item['receipt_size_bytes'],
-                item['journal_size_bytes'],
-                item['user_cycles'] / item['participant_count'],
-                item['total_cycles'] / item['participant_count'],
-                overhead,
-                item['total_time_ms'] / item['participant_count'],
-                item['timestamp']
-            ])
+        overhead, user_cycles_pp, total_cycles_pp, time_pp = metrics
+        columns = [
+            arr['n'],
+            arr['uc'],
+            arr['tc'],
+            arr['seg'],
+            arr['pms'],
+            arr['tms'],
+            arr['rcpt'],
+            arr['jnl'],
+            user_cycles_pp,
+            total_cycles_pp,
+            overhead,
+            time_pp,
+            arr['ts']
+        ]
+        writer.writerows(zip(*(column.tolist() for column in columns)))
 
     print(f"✓ Detailed CSV report saved to: {output_file}")
 
-def generate_plot(data: List[Dict[str, Any]], output_dir: str):
-    """Generate plots if matplotlib is available."""
+def generate_plot(arr: np.ndarray, overhead: np.ndarray, output_dir: str, raster: bool = False):
+    """Generate plots if matplotlib is available, as SVG or (with raster) PNG."""
     try:
         import matplotlib.pyplot as plt
         import matplotlib
@@ -161,14 +294,11 @@ def generate_plot(data: List[Dict[str, Any]], output_dir: str):
         print("      Install with: pip install matplotlib")
         return
 
-    # Sort data by participant count
-    sorted_data = sorted(data, key=lambda x: x['participant_count'])
-
-    participants = [d['participant_count'] for d in sorted_data]
-    user_cycles = [d['user_cycles'] for d in sorted_data]
-    total_cycles = [d['total_cycles'] for d in sorted_data]
-    segments = [d['session_segments'] for d in sorted_data]
-    times = [d['total_time_ms'] / 1000 for d in sorted_data]  # Convert to seconds
+    participants = arr['n']
+    user_cycles = arr['uc']
+    total_cycles = arr['tc']
+    segments = arr['seg']
+    times = arr['tms'] / 1000  # Convert to seconds
 
     # Create subplots
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
@@ -199,7 +329,6 @@ def generate_plot(data: List[Dict[str, Any]], output_dir: str):
     ax3.grid(True, alpha=0.3)
 
     # Plot 4: Overhead analysis
-    overhead = [(t - u) / u * 100 if u > 0 else 0 for u, t in zip(user_cycles, total_cycles)]
     ax4.plot(participants, overhead, 'o-', linewidth=2, markersize=6, color='#9333ea')
     ax4.set_xlabel('Number of Participants', fontsize=11)
     ax4.set_ylabel('Overhead (%)', fontsize=11)
@@ -209,20 +338,29 @@ def generate_plot(data: List[Dict[str, Any]], output_dir: str):
 
     plt.tight_layout()
 
-    output_file = os.path.join(output_dir, 'benchmark_plots.png')
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    if raster:
+        output_file = os.path.join(output_dir, 'benchmark_plots.png')
+        dpi = int(os.environ.get('BENCH_PLOT_DPI', '150'))  # Use 300 for publication-quality output
+        plt.savefig(output_file, dpi=dpi, bbox_inches='tight')
+    else:
+        # Vector output scales with the number of points rather than the pixel count
+        output_file = os.path.join(output_dir, 'benchmark_plots.svg')
+        plt.savefig(output_file, bbox_inches='tight')
     print(f"✓ Plots saved to: {output_file}")
 
 def main():
-    # Determine results directory
-    if len(sys.argv) > 1:
-        results_dir = sys.argv[1]
-    else:
-        results_dir = "benchmark_results/latest"
+    parser = argparse.ArgumentParser(description="Analyze RISC Zero auction benchmark results.")
+    parser.add_argument('results_dir', nargs='?', default="benchmark_results/latest",
+                        help="path to benchmark results directory (default: benchmark_results/latest)")
+    parser.add_argument('--raster', action='store_true',
+                        help="save plots as PNG instead of SVG (resolution set by BENCH_PLOT_DPI, default 150)")
+    args = parser.parse_args()
+    results_dir = args.results_dir
 
     if not os.path.exists(results_dir):
         print(f"Error: Results directory not found: {results_dir}")
-        print(f"\nUsage: {sys.argv[0]} [results_dir]")
+        print()
+        parser.print_usage()
         sys.exit(1)
 
     # Load data
@@ -234,16 +372,18 @@ def main():
         sys.exit(1)
 
     print(f"Loaded {len(data)} benchmark results")
+    arr = to_array(data)
+    metrics = compute_metrics(arr)
 
     # Generate statistics
-    print_statistics(data)
+    print_statistics(arr, metrics)
 
     # Generate CSV report
     csv_output = os.path.join(results_dir, "detailed_analysis.csv")
-    generate_csv_report(data, csv_output)
+    generate_csv_report(arr, metrics, csv_output)
 
-    # Generate plots
-    generate_plot(data, results_dir)
+    # Generate plots (row 0 of the metrics is the overhead %)
+    generate_plot(arr, metrics[0], results_dir, raster=args.raster)
 
     print("\n" + "="*80)
     print("Analysis complete!")
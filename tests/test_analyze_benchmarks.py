@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import analyze_benchmarks  # noqa: E402
+
+
+def _sample_array(count):
+    rng = np.random.default_rng(0)
+    records = []
+    for i in range(count):
+        n = 10 * (i + 1)
+        user_cycles = int(rng.integers(1, 10_000_000))
+        records.append({
+            'participant_count': n,
+            'user_cycles': 0 if i == 0 else user_cycles,  # exercise the zero-overhead guard
+            'total_cycles': user_cycles * 2,
+            'total_time_ms': int(rng.integers(1, 1_000_000)),
+            'session_segments': int(rng.integers(1, 64)),
+            'proving_time_ms': int(rng.integers(1, 1_000_000)),
+            'receipt_size_bytes': 240_000 + n,
+            'journal_size_bytes': 80 * n,
+            'timestamp': "2025-10-16T14:30:22+00:00",
+        })
+    return analyze_benchmarks.to_array(records)
+
+
+def test_numba_metrics_match_numpy(monkeypatch):
+    pytest.importorskip("numba")
+    arr = _sample_array(500)
+
+    expected = analyze_benchmarks.compute_metrics(arr)
+    monkeypatch.setattr(analyze_benchmarks, "_NUMBA_MIN_RECORDS", 0)
+    actual = analyze_benchmarks.compute_metrics(arr)
+
+    assert analyze_benchmarks._jitted_metrics() is not None
+    np.testing.assert_array_equal(actual, expected)